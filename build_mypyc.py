@@ -0,0 +1,32 @@
+"""
+Optional native build of the heuristic analyzer.
+
+core/analyzer.py is fully type-annotated, so mypyc can compile it to a C
+extension without code changes:
+
+    pip install mypy
+    python build_mypyc.py
+
+The extension is placed next to the source and imported in preference to
+analyzer.py. When it has not been built, the pure-Python module is used
+unchanged. Rebuild after editing analyzer.py, or delete the generated .so.
+
+This is a build script only, not packaging: the tool itself runs from a
+checkout after `pip install -r requirements.txt`.
+"""
+
+import sys
+
+from setuptools import setup
+
+try:
+    from mypyc.build import mypycify
+except ImportError:
+    sys.exit("The native build needs mypyc: pip install mypy")
+
+
+setup(
+    name="ai-api-attack-surface-analyzer",
+    ext_modules=mypycify(["core/analyzer.py"]),
+    script_args=sys.argv[1:] or ["build_ext", "--inplace"],
+)
@@ -0,0 +1,26 @@
+"""
+Crash-safe file writes for the on-disk caches.
+"""
+
+import os
+import tempfile
+from contextlib import suppress
+
+
+def write_atomic(path: str, data: bytes) -> None:
+    """
+    Write-then-rename, so readers never see a partial file. The temporary
+    file is removed if the write fails.
+    """
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as handle:
+            handle.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        with suppress(OSError):
+            os.unlink(tmp_path)
+        raise
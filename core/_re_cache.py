@@ -0,0 +1,15 @@
+"""
+Process-wide cache of compiled regular expressions.
+
+Patterns built or used at call time go through compile_re() so hot loops
+never recompile them, independent of the size of the re module's own cache.
+"""
+
+import re
+from functools import lru_cache
+
+
+@lru_cache(maxsize=1024)
+def compile_re(pattern: str, flags: int = 0) -> re.Pattern[str]:
+    """Compile pattern once per (pattern, flags) and reuse it afterwards."""
+    return re.compile(pattern, flags)
@@ -3,89 +3,224 @@ Heuristic attack-surface analysis for parsed API endpoints.
 
 This analyzer is intentionally rule-based and explainable.
 Each signal is deterministic and later can be enriched by an LLM layer.
+Signals also carry a triage severity and a human-readable reason.
 """
 
 import re
-from typing import List, Dict, Any
+from typing import Any, Callable, Dict, Iterator, List, Set, Tuple
+
+
+# Rule tables live at module level (not in the class body) so the module
+# also compiles cleanly with mypyc; see build_mypyc.py.
+
+STATE_CHANGING_METHODS = frozenset({"POST", "PUT", "PATCH", "DELETE"})
+
+IDENTIFIER_KEYWORDS = frozenset({
+    "id",
+    "user",
+    "account",
+    "org",
+    "order",
+    "tenant",
+    "customer",
+    "username",
+    "email",
+})
+
+NUMERIC_TYPES = frozenset({"number", "integer", "float"})
+
+# Keywords that raise a signal wherever they appear in the path
+PATH_KEYWORD_SIGNALS = {
+    "admin": "admin_route",
+    "token": "credential_route",
+    "secret": "credential_route",
+    "apikey": "credential_route",
+}
+
+# Every keyword rule mapped to its signal. Identifier keywords only count
+# inside {param} segments; see _inside_template().
+KEYWORD_SIGNALS: Dict[str, str] = {
+    **{keyword: "object_identifier" for keyword in IDENTIFIER_KEYWORDS},
+    **PATH_KEYWORD_SIGNALS,
+}
+
+# Paths are matched as lowercased ASCII bytes (see "path_ascii" from the
+# parser): bytes.lower() is a plain table lookup, cheaper than str.lower().
+_KEYWORD_SIGNALS_BYTES: Dict[bytes, str] = {
+    keyword.encode(): signal for keyword, signal in KEYWORD_SIGNALS.items()
+}
+
+# Compiled once: one alternation finds all keywords in a single C-level pass
+# over the path (the re equivalent of an Aho-Corasick automaton). Longest
+# first so "username" wins over "user".
+_KEYWORD_RE = re.compile(
+    b"|".join(map(re.escape, sorted(_KEYWORD_SIGNALS_BYTES, key=len, reverse=True)))
+)
+
+
+# Triage severity and reason per signal (a review priority, not a finding)
+SIGNAL_SEVERITY = {
+    "state_change": "MEDIUM",
+    "object_identifier": "MEDIUM",
+    "numeric_input": "LOW",
+    "admin_route": "HIGH",
+    "credential_route": "HIGH",
+    "authenticated_endpoint": "LOW",
+}
+
+SIGNAL_REASONS = {
+    "state_change": "State-changing method (authorization check)",
+    "object_identifier": "Sensitive identifier in path",
+    "numeric_input": "Numeric input (type and bounds handling)",
+    "admin_route": "Administrative endpoint detected",
+    "credential_route": "Credential-handling endpoint detected",
+    "authenticated_endpoint": "Authenticated endpoint (privilege boundary)",
+}
+
+SEVERITY_RANK = {"LOW": 0, "MEDIUM": 1, "HIGH": 2}
+
+
+def _inside_template(path: bytes, index: int) -> bool:
+    """True if index falls within a closed {param} segment of path."""
+    return (
+        path.rfind(b"{", 0, index) > path.rfind(b"}", 0, index)
+        and path.find(b"}", index) != -1
+    )
+
+
+def _finalize(
+    endpoint: Dict[str, Any],
+    signals: List[str],
+    identifier_param: str,
+) -> Dict[str, Any]:
+    """
+    Attach signals plus the severity and reasons derived from them, and
+    the display string of the signals (so rendering is a plain lookup).
+    """
+    severity = "LOW"
+    risk_reasons: List[str] = []
+    for signal in signals:
+        if SEVERITY_RANK[SIGNAL_SEVERITY[signal]] > SEVERITY_RANK[severity]:
+            severity = SIGNAL_SEVERITY[signal]
+        if signal == "object_identifier":
+            risk_reasons.append(f"{SIGNAL_REASONS[signal]}: {identifier_param}")
+        else:
+            risk_reasons.append(SIGNAL_REASONS[signal])
+
+    # Writes addressed by object identifier are the classic BOLA shape
+    if "state_change" in signals and "object_identifier" in signals:
+        severity = "HIGH"
+
+    return {
+        **endpoint,
+        "risk_signals": signals,
+        "risk_signals_str": " | ".join(signals),
+        "severity": severity,
+        "risk_reasons": risk_reasons,
+    }
+
+
+def _check_endpoint(
+    endpoint: Dict[str, Any],
+    _finditer: Callable[[bytes], Iterator[re.Match[bytes]]] = _KEYWORD_RE.finditer,
+    _keyword_signals: Dict[bytes, str] = _KEYWORD_SIGNALS_BYTES,
+) -> Tuple[List[str], str]:
+    """
+    Evaluate every rule against one endpoint.
+
+    Returns the emitted signals and the first identifier
+    parameter name. Hot-path helpers are bound as default arguments, so the
+    per-endpoint loop does no global or attribute lookups for them.
+    """
+    signals: List[str] = []
+
+    path = endpoint.get("path", "")
+    path_ascii = endpoint.get("path_ascii") or path.encode("ascii", "replace").lower()
+
+    # 1️⃣ Detect state-changing methods
+    if endpoint.get("method", "").upper() in STATE_CHANGING_METHODS:
+        signals.append("state_change")
+
+    # Single keyword pass over the path feeds checks 2️⃣ and 4️⃣
+    keyword_hits: Set[str] = set()
+    identifier_param = ""
+    for match in _finditer(path_ascii):
+        signal = _keyword_signals[match.group()]
+        if signal == "object_identifier":
+            if not _inside_template(path_ascii, match.start()):
+                continue
+            if not identifier_param:
+                # "replace" keeps one byte per character, so indices
+                # into path_ascii line up with the original path
+                start = path_ascii.rfind(b"{", 0, match.start()) + 1
+                identifier_param = path[start:path.find("}", start)]
+        keyword_hits.add(signal)
+
+    # 2️⃣ Detect object identifiers in path (e.g. /users/{id})
+    if "object_identifier" in keyword_hits:
+        signals.append("object_identifier")
+
+    # 3️⃣ Detect numeric inputs (potential unsafe handling)
+    for param in endpoint.get("parameters", []):
+        if param.get("type", "").lower() in NUMERIC_TYPES:
+            signals.append("numeric_input")
+            break
+
+    # 4️⃣ Detect admin-like and credential-handling routes
+    if "admin_route" in keyword_hits:
+        signals.append("admin_route")
+
+    if "credential_route" in keyword_hits:
+        signals.append("credential_route")
+
+    # 5️⃣ Detect authentication requirement (if provided by parser)
+    if endpoint.get("auth_required"):
+        signals.append("authenticated_endpoint")
+
+    return signals, identifier_param
 
 
 class AttackSurfaceAnalyzer:
     """Apply lightweight security heuristics to endpoint metadata."""
 
-    STATE_CHANGING_METHODS = {"POST", "PUT", "PATCH", "DELETE"}
-
-    IDENTIFIER_KEYWORDS = {
-        "id",
-        "user",
-        "account",
-        "org",
-        "order",
-        "tenant",
-        "customer",
-        "username",
-        "email",
-    }
-
     def __init__(self, endpoints: List[Dict[str, Any]]):
         self.endpoints = endpoints
 
     def enrich_endpoint(self, endpoint: Dict[str, Any]) -> Dict[str, Any]:
         """
-        Add structured risk signals to an endpoint.
+        Add structured risk signals to an endpoint, plus the severity and
+        reasons derived from them in the same pass.
         This does NOT classify vulnerabilities — it only emits structural signals.
         """
 
-        signals: List[str] = []
-
-        method = endpoint.get("method", "").upper()
-        path = endpoint.get("path", "")
-        parameters = endpoint.get("parameters", [])
-
-        # 1️⃣ Detect state-changing methods
-        if method in self.STATE_CHANGING_METHODS:
-            signals.append("state_change")
-
-        # 2️⃣ Detect object identifiers in path (e.g. /users/{id})
-        dynamic_params = re.findall(r"\{(.*?)\}", path)
-
-        for param in dynamic_params:
-            if any(keyword in param.lower() for keyword in self.IDENTIFIER_KEYWORDS):
-                signals.append("object_identifier")
-                break
-
-        # 3️⃣ Detect numeric inputs (potential unsafe handling)
-        for param in parameters:
-            param_type = param.get("type", "").lower()
-            if param_type in {"number", "integer", "float"}:
-                signals.append("numeric_input")
-                break
-
-        # 4️⃣ Detect admin-like routes
-        if "admin" in path.lower():
-            signals.append("admin_route")
-
-        # 5️⃣ Detect authentication requirement (if provided by parser)
-        if endpoint.get("auth_required"):
-            signals.append("authenticated_endpoint")
-
-        enriched = endpoint.copy()
-        enriched["risk_signals"] = signals
-
-        return enriched
+        signals, identifier_param = _check_endpoint(endpoint)
+        return _finalize(endpoint, signals, identifier_param)
 
     def analyze(self) -> List[Dict[str, Any]]:
         """
-        Return enriched endpoints with structural risk signals.
-        No vulnerability classification is done here.
+        Return enriched endpoints with structural risk signals, severity,
+        and risk reasons. No vulnerability classification is done here.
         """
 
         enriched_endpoints: List[Dict[str, Any]] = []
 
         for endpoint in self.endpoints:
-            enriched = self.enrich_endpoint(endpoint)
+            signals, identifier_param = _check_endpoint(endpoint)
 
             # Only keep endpoints that have signals
-            if enriched["risk_signals"]:
-                enriched_endpoints.append(enriched)
-
-        return enriched_endpoints
\ No newline at end of file
+            if signals:
+                enriched_endpoints.append(_finalize(endpoint, signals, identifier_param))
+
+        return enriched_endpoints
+
+
+def analyze_chunk(endpoints: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Process-pool entry point: analyze one slice of a spec.
+    Lives here rather than in main.py so it is pickled by reference to this
+    module. Forked workers then run it without touching the CLI; under the
+    spawn and forkserver start methods (macOS, Windows, and Linux from
+    Python 3.14) workers still re-run main.py's top level as __mp_main__,
+    importing Rich and building its session, though no request is made.
+    """
+    return AttackSurfaceAnalyzer(endpoints).analyze()
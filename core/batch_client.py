@@ -0,0 +1,134 @@
+"""
+OpenAI Batch API client for non-interactive scans.
+
+Requests are written as JSONL, uploaded, and processed asynchronously by the
+provider at roughly half the price of real-time calls. The batch is polled
+until it finishes, and results are demultiplexed by custom_id.
+
+OpenRouter exposes no batch endpoint, so this talks to OpenAI directly and
+needs OPENAI_API_KEY.
+"""
+
+import json
+import os
+import time
+import requests
+from typing import List, Dict, Any
+
+
+OPENAI_API_URL = "https://api.openai.com/v1"
+BATCH_MODEL_NAME = os.getenv("OPENAI_BATCH_MODEL", "gpt-4o-mini")
+
+BATCH_TERMINAL_STATUSES = {"completed", "failed", "expired", "cancelled"}
+
+
+class OpenAIBatchClient:
+    """Submit chat completions as one provider batch and wait for results."""
+
+    def __init__(self, poll_interval: int = 30):
+        self.api_key = os.getenv("OPENAI_API_KEY")
+        self.poll_interval = poll_interval
+
+        if not self.api_key:
+            raise ValueError("OPENAI_API_KEY not set in environment.")
+
+        self.session = requests.Session()
+        self.session.headers.update({"Authorization": f"Bearer {self.api_key}"})
+
+    def run(
+        self,
+        conversations: Dict[str, List[Dict[str, str]]],
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        Submit one chat completion per custom_id and block until the batch
+        reaches a terminal status.
+
+        Returns custom_id -> {"content": str, "usage": dict} or {"error": str}.
+        Raises requests.RequestException on transport/API failures.
+        """
+        lines = [
+            json.dumps({
+                "custom_id": custom_id,
+                "method": "POST",
+                "url": "/v1/chat/completions",
+                "body": {
+                    "model": BATCH_MODEL_NAME,
+                    "messages": messages,
+                    "temperature": 0.2,
+                },
+            })
+            for custom_id, messages in conversations.items()
+        ]
+
+        upload = self.session.post(
+            f"{OPENAI_API_URL}/files",
+            data={"purpose": "batch"},
+            files={"file": ("requests.jsonl", "\n".join(lines).encode())},
+            timeout=120,
+        )
+        upload.raise_for_status()
+
+        response = self.session.post(
+            f"{OPENAI_API_URL}/batches",
+            json={
+                "input_file_id": upload.json()["id"],
+                "endpoint": "/v1/chat/completions",
+                "completion_window": "24h",
+            },
+            timeout=60,
+        )
+        response.raise_for_status()
+        batch = response.json()
+
+        while batch["status"] not in BATCH_TERMINAL_STATUSES:
+            counts = batch.get("request_counts") or {}
+            print(
+                f"[*] Batch {batch['id']}: {batch['status']} "
+                f"({counts.get('completed', 0)}/{counts.get('total', len(conversations))})"
+            )
+            time.sleep(self.poll_interval)
+
+            response = self.session.get(f"{OPENAI_API_URL}/batches/{batch['id']}", timeout=60)
+            response.raise_for_status()
+            batch = response.json()
+
+        print(f"[+] Batch {batch['id']}: {batch['status']}")
+
+        results: Dict[str, Dict[str, Any]] = {}
+
+        # Successful lines land in the output file, failed ones in the error file
+        for file_key in ("output_file_id", "error_file_id"):
+            if batch.get(file_key):
+                results.update(self._read_results(batch[file_key]))
+
+        for custom_id in conversations:
+            results.setdefault(custom_id, {"error": f"No batch result (batch {batch['status']})"})
+
+        return results
+
+    def _read_results(self, file_id: str) -> Dict[str, Dict[str, Any]]:
+        response = self.session.get(f"{OPENAI_API_URL}/files/{file_id}/content", timeout=120)
+        response.raise_for_status()
+
+        results: Dict[str, Dict[str, Any]] = {}
+
+        for line in response.text.splitlines():
+            if not line.strip():
+                continue
+
+            record = json.loads(line)
+            reply = record.get("response") or {}
+
+            if record.get("error"):
+                outcome = {"error": f"Batch request failed: {record['error'].get('message')}"}
+            elif reply.get("status_code") != 200:
+                outcome = {"error": f"Batch request failed: HTTP {reply.get('status_code')}"}
+            else:
+                outcome = {
+                    "content": reply["body"]["choices"][0]["message"]["content"],
+                    "usage": reply["body"].get("usage"),
+                }
+
+            results[record["custom_id"]] = outcome
+
+        return results
@@ -0,0 +1,68 @@
+"""
+LLM spend accounting.
+
+Each call's cost is taken from the provider's usage report when present
+(OpenRouter includes the charged cost), otherwise priced from token counts.
+Responses are cut off once their JSON answer is complete, which drops the
+trailing usage chunk; those calls are priced from a character-based token
+estimate and counted as estimated. With a budget set, streams are read to
+the usage report instead, so the cap is checked against billed spend.
+"""
+
+from dataclasses import dataclass, replace
+from typing import Dict, Tuple
+
+
+# USD per million (prompt, completion) tokens. Approximate list prices;
+# update when the provider changes them.
+PRICES: Dict[str, Tuple[float, float]] = {
+    "openai/gpt-oss-120b": (0.10, 0.50),
+    "openai/gpt-oss-20b": (0.05, 0.20),
+    "gpt-4o-mini": (0.15, 0.60),
+}
+
+# Used for models missing from PRICES, erring on the expensive side
+DEFAULT_PRICE = (1.00, 4.00)
+
+# Rough tokenizer-free estimate for English/JSON text
+CHARS_PER_TOKEN = 4
+
+
+def price(model: str, prompt_tokens: int, completion_tokens: int) -> float:
+    """Cost in USD of one call at list prices."""
+    prompt_price, completion_price = PRICES.get(model, DEFAULT_PRICE)
+    return (prompt_tokens * prompt_price + completion_tokens * completion_price) / 1_000_000
+
+
+def estimate_tokens(text: str) -> int:
+    return -(-len(text) // CHARS_PER_TOKEN)
+
+
+@dataclass(frozen=True)
+class CostTracker:
+    """Immutable running totals; add() returns an updated copy."""
+
+    calls: int = 0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    cached_prompt_tokens: int = 0
+    usd: float = 0.0
+    estimated_calls: int = 0
+
+    def add(
+        self,
+        prompt_tokens: int,
+        completion_tokens: int,
+        usd: float,
+        cached_prompt_tokens: int = 0,
+        estimated: bool = False,
+    ) -> "CostTracker":
+        return replace(
+            self,
+            calls=self.calls + 1,
+            prompt_tokens=self.prompt_tokens + prompt_tokens,
+            completion_tokens=self.completion_tokens + completion_tokens,
+            cached_prompt_tokens=self.cached_prompt_tokens + cached_prompt_tokens,
+            usd=self.usd + usd,
+            estimated_calls=self.estimated_calls + int(estimated),
+        )
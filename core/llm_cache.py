@@ -0,0 +1,85 @@
+"""
+Disk-backed cache for LLM responses.
+
+Each response is stored as a JSON file named after a hash of the model and
+the exact messages sent, so repeated scans of the same API are answered
+from disk instead of the network. Endpoint verdicts are additionally keyed
+by the endpoint payload itself, so they survive changes in how endpoints
+are grouped into batched calls.
+"""
+
+import hashlib
+import json
+import os
+import time
+from typing import List, Dict, Any
+
+from core._atomic_write import write_atomic
+
+
+CACHE_DIR = os.path.expanduser("~/.cache/ai-api-attack-surface")
+CACHE_TTL_SECONDS = 30 * 86400
+
+
+class LLMCache:
+    """Content-addressed store of parsed model responses."""
+
+    def __init__(
+        self,
+        directory: str = CACHE_DIR,
+        ttl: int = CACHE_TTL_SECONDS,
+        enabled: bool = True,
+    ):
+        self.directory = directory
+        self.ttl = ttl
+        self.enabled = enabled
+
+    @staticmethod
+    def make_key(model: str, messages: List[Dict[str, str]]) -> str:
+        """Stable hash of a request; key order in messages does not matter."""
+        canonical_payload = json.dumps(
+            {"m": model, "msgs": messages},
+            sort_keys=True,
+        ).encode()
+        return hashlib.blake2b(canonical_payload).hexdigest()
+
+    @staticmethod
+    def make_endpoint_key(model: str, endpoint: Dict[str, Any]) -> str:
+        """Stable hash of one endpoint payload (method, path, signals, ...)."""
+        canonical_payload = json.dumps(
+            {"m": model, "endpoint": endpoint},
+            sort_keys=True,
+        ).encode()
+        return hashlib.blake2b(canonical_payload).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.json")
+
+    def get(self, key: str) -> Any | None:
+        """Return the cached value, or None on miss, expiry or when disabled."""
+        if not self.enabled:
+            return None
+
+        path = self._path(key)
+
+        try:
+            if time.time() - os.path.getmtime(path) > self.ttl:
+                os.remove(path)
+                return None
+
+            with open(path, "r", encoding="utf-8") as handle:
+                return json.load(handle)
+
+        except (OSError, ValueError):
+            return None
+
+    def set(self, key: str, value: Any) -> None:
+        """Store a value; failures are ignored since the cache is best-effort."""
+        if not self.enabled:
+            return
+
+        try:
+            write_atomic(self._path(key), json.dumps(value).encode())
+
+        except OSError:
+            pass
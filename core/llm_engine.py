@@ -2,55 +2,399 @@
 LLM engine for structured API security reasoning.
 
 Uses OpenRouter-compatible API to:
-1. Analyze endpoints individually.
+1. Analyze endpoints individually or in batches.
 2. Perform global pattern analysis.
 
+Non-interactive scans can instead go through the OpenAI Batch API
+(see core/batch_client.py).
+
 Includes:
 - Strict JSON enforcement
 - Safe JSON extraction fallback
 - HTTP error handling
+- Pooled keep-alive session with retry/backoff on 429 and 5xx
+- Streamed responses, cut off as soon as the JSON answer is complete
+- Bounded concurrency across batched calls, optionally rate-limited (QPS)
+- Disk cache of parsed responses
+- Spend tracking with an optional budget cap
+- In-memory reuse across structurally identical endpoints
 - Deterministic low-temperature output
 """
 
 import os
 import json
-import re
+import threading
 import requests
-from typing import List, Dict, Any
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from requests.adapters import HTTPAdapter
+from typing import Callable, List, Dict, Any, Tuple
+from urllib.parse import urlsplit
+from urllib3.util.retry import Retry
+
+from core._re_cache import compile_re
+from core.batch_client import BATCH_MODEL_NAME, OpenAIBatchClient
+from core.cost_tracker import CostTracker, estimate_tokens, price
+from core.llm_cache import LLMCache
+from core.rate_limiter import RateLimiter
 
 
 OPENROUTER_URL = "https://openrouter.ai/api/v1/chat/completions"
 MODEL_NAME = "openai/gpt-oss-120b"  # Cambiar si quieres otro modelo
 
+# Endpoint-level routing: simple endpoints go to a cheaper sibling model,
+# the rest (and the global review) to MODEL_NAME
+MODEL_STRONG = MODEL_NAME
+MODEL_CHEAP = "openai/gpt-oss-20b"
+
+# Below this many endpoints, batching saves too little to be worth the
+# larger prompt, so endpoints are analyzed one request at a time.
+MIN_BATCH_SIZE = 4
+
+# Transient provider answers worth retrying; 4xx client errors are not
+RETRY_STATUSES = [429, 500, 502, 503, 504]
+
+# Upper bound on model output handed to the JSON parser
+MAX_PARSE_CHARS = 1_000_000
+
+# Compact JSON for prompts: no whitespace between tokens
+COMPACT_SEPARATORS = (",", ":")
+
+# Model prefix whose provider needs explicit cache breakpoints; other
+# providers cache identical prompt prefixes automatically
+EXPLICIT_PROMPT_CACHE_PREFIX = "anthropic/"
+
+# Batch API requests are billed at half the real-time price
+BATCH_DISCOUNT = 0.5
+
+# Endpoint shapes remembered in memory (least recently used evicted first)
+SHAPE_CACHE_SIZE = 1000
+
+# System prompts are fixed module constants: every call starts with the same
+# byte-identical prefix, which provider-side prompt caching can reuse.
+# Endpoint fields use the short keys produced by _compact().
+ENDPOINT_SYSTEM_PROMPT = """
+You are a senior API security researcher.
+
+Analyze the given endpoint structure.
+Endpoint keys: m=method, p=path, q=parameter names, r=heuristic risk signals, a=authentication required.
+
+Rules:
+- Do NOT invent vulnerabilities.
+- Base reasoning only on provided structure.
+- Do NOT include explanations outside JSON.
+- Respond ONLY with valid JSON.
+
+Return exactly:
+
+{
+  "vulnerability_class": "string",
+  "risk_level": "Low|Medium|High",
+  "reasoning": "string",
+  "conceptual_test_idea": "string"
+}
+""".strip()
+
+CHUNK_SYSTEM_PROMPT = """
+You are a senior API security researcher.
+
+Analyze each endpoint structure in the given list independently.
+Endpoint keys: m=method, p=path, q=parameter names, r=heuristic risk signals, a=authentication required.
+
+Rules:
+- Do NOT invent vulnerabilities.
+- Base reasoning only on provided structure.
+- Do NOT include explanations outside JSON.
+- Respond ONLY with valid JSON.
+
+Return exactly one JSON array with one entry per endpoint,
+using the "idx" of the endpoint it describes:
+
+[
+  {
+    "idx": 0,
+    "vulnerability_class": "string",
+    "risk_level": "Low|Medium|High",
+    "reasoning": "string",
+    "conceptual_test_idea": "string"
+  }
+]
+""".strip()
+
+GLOBAL_SYSTEM_PROMPT = """
+You are a senior API security researcher.
+
+Analyze the entire API surface holistically.
+Endpoint keys: m=method, p=path, q=parameter names, r=heuristic risk signals, a=authentication required.
+
+Look for:
+- Systemic access control weaknesses
+- Privilege separation issues
+- Abuse chains
+- Structural anti-patterns
+
+Do NOT invent implementation details.
+Respond ONLY with valid JSON.
+
+Return exactly:
+
+{
+  "systemic_risks": "string",
+  "privilege_patterns": "string",
+  "abuse_chains": "string",
+  "overall_risk_assessment": "Low|Medium|High"
+}
+""".strip()
+
+
+class _JSONBoundary:
+    """
+    Incremental scanner that finds the first parseable top-level JSON object
+    or array. Brackets inside string literals are ignored. A balanced
+    candidate that does not parse (bracketed prose such as "[see below]")
+    is skipped as a whole, so the scan stays linear.
+    """
 
-class LLMEngine:
     def __init__(self):
+        self.consumed = 0
+        self.value: Dict[str, Any] | List[Any] | None = None
+        self._restart()
+
+    def _restart(self) -> None:
+        self.started = False
+        self.depth = 0
+        self.in_string = False
+        self.escaped = False
+        # Text of the current candidate from earlier pieces, and where it
+        # begins in the current piece
+        self.pieces: List[str] = []
+        self.piece_start = 0
+
+    def feed(self, text: str) -> int | None:
+        """
+        Scan the next piece of text. Returns the end offset (exclusive,
+        counted over everything fed so far) once a value closes and parses;
+        the decoded value is then in self.value.
+        """
+        for index, char in enumerate(text):
+            if not self.started:
+                if char in "{[":
+                    self.started = True
+                    self.depth = 1
+                    self.piece_start = index
+                continue
+
+            if self.in_string:
+                if self.escaped:
+                    self.escaped = False
+                elif char == "\\":
+                    self.escaped = True
+                elif char == '"':
+                    self.in_string = False
+                continue
+
+            if char == '"':
+                self.in_string = True
+            elif char in "{[":
+                self.depth += 1
+            elif char in "}]":
+                self.depth -= 1
+                if self.depth == 0:
+                    candidate = "".join(self.pieces) + text[self.piece_start:index + 1]
+                    try:
+                        self.value = json.loads(candidate)
+                    except (json.JSONDecodeError, RecursionError):
+                        self._restart()
+                        continue
+                    end = self.consumed + index + 1
+                    self.consumed += len(text)
+                    return end
+
+        if self.started:
+            self.pieces.append(text[self.piece_start:])
+            self.piece_start = 0
+
+        self.consumed += len(text)
+        return None
+
+
+def _compact(endpoint: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Endpoint as the model sees it: method, path, parameter names, signals
+    and auth requirement under one-letter keys (explained in the prompts).
+    Prose (description), derived fields (severity, reasons) and internal
+    fields (path_ascii) are left out.
+    """
+    return {
+        "m": endpoint.get("method", ""),
+        "p": endpoint.get("path", ""),
+        "q": [param.get("name") for param in endpoint.get("parameters", [])],
+        "r": endpoint.get("risk_signals", []),
+        "a": bool(endpoint.get("auth_required")),
+    }
+
+
+def _with_prompt_cache(
+    messages: List[Dict[str, str]],
+    model: str,
+) -> List[Dict[str, Any]]:
+    """
+    Messages as sent to the provider: for models that need it, the static
+    system prompt is marked as an ephemeral cache breakpoint.
+    """
+    if not model.startswith(EXPLICIT_PROMPT_CACHE_PREFIX):
+        return messages
+
+    return [
+        {
+            "role": "system",
+            "content": [
+                {
+                    "type": "text",
+                    "text": message["content"],
+                    "cache_control": {"type": "ephemeral"},
+                }
+            ],
+        }
+        if message["role"] == "system"
+        else message
+        for message in messages
+    ]
+
+
+def canonical_key(endpoint: Dict[str, Any]) -> Tuple[str, str]:
+    """
+    Structural identity of an endpoint: method plus path with parameter
+    names erased, so /users/{id} and /users/{userId} share one verdict.
+    """
+    return (
+        endpoint.get("method", "").upper(),
+        compile_re(r"\{[^}]+\}").sub("{}", endpoint.get("path", "")),
+    )
+
+
+def _as_object(result: Dict[str, Any] | List[Any]) -> Dict[str, Any]:
+    """A verdict is one JSON object; any other answer becomes an error."""
+    if isinstance(result, dict):
+        return result
+    return {
+        "error": "Expected a JSON object from model",
+        "raw": json.dumps(result),
+    }
+
+
+def mount_provider_adapter(session: requests.Session, pool_maxsize: int) -> None:
+    """
+    Mount a keep-alive pool for the provider on session. Retry honours
+    Retry-After on 429 and backs off exponentially. Mounted on the provider
+    prefix only, so the session keeps its own adapter for other hosts.
+    """
+    retry = Retry(
+        total=5,
+        backoff_factor=0.5,
+        status_forcelist=RETRY_STATUSES,
+        allowed_methods=["POST"],
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+    provider = urlsplit(OPENROUTER_URL)
+    session.mount(
+        f"{provider.scheme}://{provider.netloc}/",
+        HTTPAdapter(pool_maxsize=pool_maxsize, max_retries=retry),
+    )
+
+
+class LLMEngine:
+    def __init__(
+        self,
+        max_concurrency: int = 8,
+        batch_api: bool = False,
+        use_cache: bool = True,
+        session: requests.Session | None = None,
+        qps: float | None = None,
+        budget_usd: float | None = None,
+    ):
         self.api_key = os.getenv("OPENROUTER_API_KEY")
+        self.max_concurrency = max_concurrency
+        self.cache = LLMCache(enabled=use_cache)
+        self._call_cache: OrderedDict[Tuple[str, str], Dict[str, Any]] = OrderedDict()
+        self._call_cache_lock = threading.Lock()
+        # Shared by all workers; None means no client-side limit
+        self.limiter = RateLimiter(qps) if qps is not None else None
+        # Replaced (never mutated) under the lock; see _record_cost()
+        self.cost = CostTracker()
+        self.budget_usd = budget_usd
+        self._cost_lock = threading.Lock()
+
+        # Batch mode talks to the OpenAI Batch API only; no OpenRouter key needed
+        if batch_api:
+            # Spend is only known once the whole batch has been billed
+            if budget_usd is not None:
+                raise ValueError("A budget cannot be enforced with the Batch API.")
+            self.batch_client = OpenAIBatchClient()
+            return
 
         if not self.api_key:
             raise ValueError("OPENROUTER_API_KEY not set in environment.")
 
+        # A shared session comes with the provider adapter already mounted
+        if session is None:
+            session = requests.Session()
+            # +1 leaves a connection for the global review running alongside
+            mount_provider_adapter(session, pool_maxsize=max_concurrency + 1)
+        self.session = session
+
+        # Per request rather than on the session: a shared session also
+        # talks to the target, which must never see the API key
+        self.headers = {
+            "Authorization": f"Bearer {self.api_key}",
+            "Content-Type": "application/json",
+        }
+
+    def warm_up(self) -> None:
+        """
+        Open (and keep pooled) a connection to the provider ahead of the
+        first call. Best-effort: failures are left to the real calls.
+        """
+        provider = urlsplit(OPENROUTER_URL)
+        try:
+            self.session.head(f"{provider.scheme}://{provider.netloc}/", timeout=3)
+        except requests.exceptions.RequestException:
+            pass
+
     # --------------------------
     # INTERNAL SAFE JSON PARSER
     # --------------------------
 
-    def _safe_json_parse(self, text: str) -> Dict[str, Any]:
+    def _first_json(self, text: str) -> Dict[str, Any] | List[Any] | None:
+        """
+        Decode the first JSON array or object embedded in text, if any.
+        Linear scan, unlike a greedy regex over the whole output.
+        """
+        boundary = _JSONBoundary()
+        if boundary.feed(text) is None:
+            return None
+        return boundary.value
+
+    def _safe_json_parse(self, text: str) -> Dict[str, Any] | List[Any]:
         """
         Attempts strict JSON parsing.
-        If it fails, extracts first JSON object via regex.
+        If it fails, decodes the first JSON array or object embedded in it.
+        Input beyond MAX_PARSE_CHARS is ignored.
         """
+        text = text[:MAX_PARSE_CHARS]
+
         try:
             return json.loads(text)
-        except json.JSONDecodeError:
-            match = re.search(r"\{.*\}", text, re.DOTALL)
-            if match:
-                try:
-                    return json.loads(match.group())
-                except json.JSONDecodeError:
-                    return {
-                        "error": "Malformed JSON from model",
-                        "raw": text,
-                    }
+        except (json.JSONDecodeError, RecursionError):
+            candidate = self._first_json(text)
+            if candidate is not None:
+                return candidate
+            if "{" in text or "[" in text:
+                return {
+                    "error": "Malformed JSON from model",
+                    "raw": text,
+                }
             return {
                 "error": "No JSON object detected",
                 "raw": text,
@@ -60,32 +404,145 @@ class LLMEngine:
     # CORE MODEL CALL
     # --------------------------
 
-    def _call_model(self, messages: List[Dict[str, str]]) -> Dict[str, Any]:
-        headers = {
-            "Authorization": f"Bearer {self.api_key}",
-            "Content-Type": "application/json",
-        }
+    def _read_stream(
+        self,
+        response: requests.Response,
+    ) -> Tuple[str, Dict[str, Any] | None]:
+        """
+        Accumulate streamed (SSE) completion text, returning as soon as it
+        holds a complete JSON value instead of waiting for the stream to end.
+        With a budget set, the rest of the stream is still read (not kept)
+        up to the usage report, so the cap is checked against billed spend.
+        Also returns the usage report if the stream got that far.
+        """
+        parts: List[str] = []
+        usage: Dict[str, Any] | None = None
+        boundary = _JSONBoundary()
+        complete = False
+
+        for line in response.iter_lines():
+            # Skip keep-alive comments (": OPENROUTER PROCESSING") and blanks
+            if not line.startswith(b"data:"):
+                continue
+
+            data = line[len(b"data:"):].strip()
+            if data == b"[DONE]":
+                break
+
+            chunk = json.loads(data)
+            if "error" in chunk:
+                raise RuntimeError(chunk["error"].get("message", "stream error"))
+
+            if not complete and chunk.get("choices"):
+                delta = chunk["choices"][0].get("delta", {}).get("content") or ""
+                parts.append(delta)
+                complete = boundary.feed(delta) is not None
+                if complete and self.budget_usd is None:
+                    break
+
+            # Sent with (or after) the last content chunk
+            if chunk.get("usage"):
+                usage = chunk["usage"]
+                break
+
+        return "".join(parts), usage
+
+    # --------------------------
+    # SPEND TRACKING
+    # --------------------------
+
+    def over_budget(self) -> bool:
+        return self.budget_usd is not None and self.cost.usd >= self.budget_usd
+
+    def _record_cost(
+        self,
+        model: str,
+        messages: List[Dict[str, str]],
+        content: str,
+        usage: Dict[str, Any] | None,
+        discount: float = 1.0,
+    ) -> None:
+        """Add one call to the running totals, estimating tokens if unreported."""
+        cached_tokens = 0
+
+        if usage:
+            prompt_tokens = usage.get("prompt_tokens", 0)
+            completion_tokens = usage.get("completion_tokens", 0)
+            # Prompt-cache hits (OpenAI-style details, or Anthropic's field)
+            cached_tokens = (
+                (usage.get("prompt_tokens_details") or {}).get("cached_tokens")
+                or usage.get("cache_read_input_tokens")
+                or 0
+            )
+            # OpenRouter reports what it actually charged
+            usd = usage.get("cost")
+            if usd is None:
+                usd = price(model, prompt_tokens, completion_tokens) * discount
+        else:
+            prompt_tokens = sum(estimate_tokens(message["content"]) for message in messages)
+            completion_tokens = estimate_tokens(content)
+            usd = price(model, prompt_tokens, completion_tokens) * discount
+
+        with self._cost_lock:
+            self.cost = self.cost.add(
+                prompt_tokens,
+                completion_tokens,
+                usd,
+                cached_prompt_tokens=cached_tokens,
+                estimated=not usage,
+            )
+
+    def _call_model(
+        self,
+        messages: List[Dict[str, str]],
+        model: str = MODEL_NAME,
+    ) -> Dict[str, Any] | List[Any]:
+        cache_key = self.cache.make_key(model, messages)
+        cached = self.cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+        # Calls still queued once the budget is spent are skipped; they are
+        # not cached (nor checkpointed), so a later run picks them up
+        if self.over_budget():
+            return {
+                "error": f"Budget of ${self.budget_usd:.4f} exhausted; call skipped"
+            }
 
         payload = {
-            "model": MODEL_NAME,
-            "messages": messages,
+            "model": model,
+            "messages": _with_prompt_cache(messages, model),
             "temperature": 0.2,  # Low temperature for deterministic output
+            "stream": True,
+            "usage": {"include": True},  # OpenRouter: report tokens and cost
         }
 
+        if self.limiter:
+            self.limiter.acquire()
+
         try:
-            response = requests.post(
+            # Leaving the block closes the response, dropping any output the
+            # model is still producing after its JSON answer (unless a budget
+            # is set; see _read_stream())
+            with self.session.post(
                 OPENROUTER_URL,
-                headers=headers,
                 json=payload,
+                headers=self.headers,
                 timeout=60,
-            )
+                stream=True,
+            ) as response:
+                response.raise_for_status()
+                content, usage = self._read_stream(response)
+
+            self._record_cost(model, messages, content, usage)
 
-            response.raise_for_status()
-            data = response.json()
+            result = self._safe_json_parse(content)
 
-            content = data["choices"][0]["message"]["content"]
+            # Never cache failures, so the next run retries them
+            if not (isinstance(result, dict) and "error" in result):
+                self.cache.set(cache_key, result)
 
-            return self._safe_json_parse(content)
+            return result
 
         except requests.exceptions.RequestException as exc:
             return {
@@ -98,80 +555,298 @@ class LLMEngine:
             }
 
     # --------------------------
-    # PHASE 1 – ENDPOINT LEVEL
+    # SHAPE-LEVEL MEMOIZATION
     # --------------------------
 
-    def analyze_endpoint(self, endpoint: Dict[str, Any]) -> Dict[str, Any]:
-        system_prompt = """
-You are a senior API security researcher.
+    def _endpoint_cache_key(self, endpoint: Dict[str, Any]) -> str:
+        """Disk-cache key for one endpoint verdict, independent of batching."""
+        return self.cache.make_endpoint_key(self.select_model(endpoint), _compact(endpoint))
 
-Analyze the given endpoint structure.
+    def _recall(self, key: Tuple[str, str]) -> Dict[str, Any] | None:
+        with self._call_cache_lock:
+            result = self._call_cache.get(key)
+            if result is not None:
+                self._call_cache.move_to_end(key)
+            return result
 
-Rules:
-- Do NOT invent vulnerabilities.
-- Base reasoning only on provided structure.
-- Do NOT include explanations outside JSON.
-- Respond ONLY with valid JSON.
+    def _remember(self, key: Tuple[str, str], result: Dict[str, Any]) -> None:
+        if "error" in result:
+            return
 
-Return exactly:
+        with self._call_cache_lock:
+            self._call_cache[key] = result
+            self._call_cache.move_to_end(key)
+            if len(self._call_cache) > SHAPE_CACHE_SIZE:
+                self._call_cache.popitem(last=False)
 
-{
-  "vulnerability_class": "string",
-  "risk_level": "Low|Medium|High",
-  "reasoning": "string",
-  "conceptual_test_idea": "string"
-}
-"""
+    # --------------------------
+    # PHASE 1 – ENDPOINT LEVEL
+    # --------------------------
 
+    @staticmethod
+    def select_model(endpoint: Dict[str, Any]) -> str:
+        """
+        Route an endpoint to a model: fewer than two heuristic signals and
+        no parameters (declared or templated) is cheap-model work.
+        """
+        if (
+            len(endpoint.get("risk_signals", [])) < 2
+            and not endpoint.get("parameters")
+            and "{" not in endpoint.get("path", "")
+        ):
+            return MODEL_CHEAP
+        return MODEL_STRONG
+
+    def _endpoint_messages(self, endpoint: Dict[str, Any]) -> List[Dict[str, str]]:
         user_prompt = f"""
 Endpoint data:
-{json.dumps(endpoint, indent=2)}
+{json.dumps(_compact(endpoint), separators=COMPACT_SEPARATORS)}
 """
 
-        messages = [
-            {"role": "system", "content": system_prompt.strip()},
+        return [
+            {"role": "system", "content": ENDPOINT_SYSTEM_PROMPT},
             {"role": "user", "content": user_prompt.strip()},
         ]
 
-        return self._call_model(messages)
+    def analyze_endpoint(self, endpoint: Dict[str, Any]) -> Dict[str, Any]:
+        key = canonical_key(endpoint)
+        cached = self._recall(key)
+        if cached is not None:
+            return cached
+
+        result = _as_object(self._call_model(
+            self._endpoint_messages(endpoint),
+            model=self.select_model(endpoint),
+        ))
+        self._remember(key, result)
+        return result
+
+    def analyze_endpoints_batch(
+        self,
+        endpoints: List[Dict[str, Any]],
+        batch_size: int = 16,
+        on_progress: Callable[[int, int], None] | None = None,
+        on_result: Callable[[int, Dict[str, Any]], None] | None = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Analyze many endpoints with one model call per chunk (or per
+        endpoint, for small inputs). Calls are sent concurrently, at most
+        max_concurrency at a time.
+        Structurally identical endpoints are only sent once, and endpoints
+        answered on a previous run are served from the disk cache.
+        on_progress(done, total) is called as calls complete, counting
+        endpoints actually sent to the model. on_result(index, result) is
+        called once per input endpoint as soon as its result is known
+        (e.g. for checkpointing).
+        Returns one result per endpoint, in input order.
+        """
+        keys = [canonical_key(endpoint) for endpoint in endpoints]
+
+        indices_by_key: Dict[Tuple[str, str], List[int]] = {}
+        for index, key in enumerate(keys):
+            indices_by_key.setdefault(key, []).append(index)
+
+        resolved: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        pending: Dict[Tuple[str, str], Dict[str, Any]] = {}
+
+        for key, endpoint in zip(keys, endpoints):
+            if key in resolved or key in pending:
+                continue
+            cached = self._recall(key)
+            if cached is None:
+                cached = self.cache.get(self._endpoint_cache_key(endpoint))
+            if cached is not None:
+                resolved[key] = cached
+            else:
+                pending[key] = endpoint
+
+        unique = list(pending.values())
+        pending_keys = list(pending)
+
+        analyses: Dict[int, Dict[str, Any]] = {}
+
+        def settle(positions: List[int]) -> None:
+            if on_result:
+                for position in positions:
+                    for index in indices_by_key[pending_keys[position]]:
+                        on_result(index, analyses[position])
+            if on_progress:
+                on_progress(len(analyses), len(unique))
+
+        if on_result:
+            for key, result in resolved.items():
+                for index in indices_by_key[key]:
+                    on_result(index, result)
+
+        settle([])
+
+        # Managed by hand rather than with "with": on Ctrl-C (or any error)
+        # queued calls are cancelled instead of still being sent and paid for
+        executor = ThreadPoolExecutor(max_workers=self.max_concurrency)
 
-    # --------------------------
-    # PHASE 2 – GLOBAL ANALYSIS
-    # --------------------------
+        try:
+            if len(unique) < MIN_BATCH_SIZE:
+                single_futures = {
+                    executor.submit(self.analyze_endpoint, endpoint): position
+                    for position, endpoint in enumerate(unique)
+                }
+                for single_future in as_completed(single_futures):
+                    analyses[single_futures[single_future]] = single_future.result()
+                    settle([single_futures[single_future]])
+            else:
+                # A chunk goes to a single model, so group by routed model first
+                by_model: Dict[str, List[int]] = {}
+                for position, endpoint in enumerate(unique):
+                    by_model.setdefault(self.select_model(endpoint), []).append(position)
+
+                chunk_futures = {
+                    executor.submit(
+                        self._analyze_chunk,
+                        [unique[position] for position in chunk],
+                        model,
+                    ): chunk
+                    for model, positions in by_model.items()
+                    for chunk in (
+                        positions[start:start + batch_size]
+                        for start in range(0, len(positions), batch_size)
+                    )
+                }
+                for chunk_future in as_completed(chunk_futures):
+                    analyses.update(zip(chunk_futures[chunk_future], chunk_future.result()))
+                    settle(chunk_futures[chunk_future])
+        except BaseException:
+            executor.shutdown(wait=False, cancel_futures=True)
+            raise
+
+        executor.shutdown()
+
+        for position, (key, endpoint) in enumerate(pending.items()):
+            result = analyses[position]
+            self._remember(key, result)
+            if "error" not in result:
+                self.cache.set(self._endpoint_cache_key(endpoint), result)
+            resolved[key] = result
+
+        return [resolved[key] for key in keys]
+
+    def _analyze_chunk(
+        self,
+        chunk: List[Dict[str, Any]],
+        model: str = MODEL_NAME,
+    ) -> List[Dict[str, Any]]:
+        user_prompt = f"""
+Endpoints data:
+{json.dumps([{"idx": i, **_compact(ep)} for i, ep in enumerate(chunk)], separators=COMPACT_SEPARATORS)}
+"""
 
-    def analyze_global(self, endpoints: List[Dict[str, Any]]) -> Dict[str, Any]:
-        system_prompt = """
-You are a senior API security researcher.
+        messages = [
+            {"role": "system", "content": CHUNK_SYSTEM_PROMPT},
+            {"role": "user", "content": user_prompt.strip()},
+        ]
 
-Analyze the entire API surface holistically.
+        response = self._call_model(messages, model=model)
 
-Look for:
-- Systemic access control weaknesses
-- Privilege separation issues
-- Abuse chains
-- Structural anti-patterns
+        # Request failure (not a parse failure, which carries "raw"):
+        # retrying endpoint by endpoint would fail the same way
+        if isinstance(response, dict) and "error" in response and "raw" not in response:
+            return [response for _ in chunk]
 
-Do NOT invent implementation details.
-Respond ONLY with valid JSON.
+        by_index: Dict[int, Dict[str, Any]] = {}
+        if isinstance(response, list):
+            for item in response:
+                if isinstance(item, dict) and isinstance(item.get("idx"), int):
+                    by_index[item.pop("idx")] = item
 
-Return exactly:
+        # Unparseable or incomplete batch answer: fall back to batch size 1
+        # for whichever endpoints the model did not answer
+        return [
+            by_index[i] if i in by_index else self.analyze_endpoint(endpoint)
+            for i, endpoint in enumerate(chunk)
+        ]
 
-{
-  "systemic_risks": "string",
-  "privilege_patterns": "string",
-  "abuse_chains": "string",
-  "overall_risk_assessment": "Low|Medium|High"
-}
-"""
+    # --------------------------
+    # PHASE 2 – GLOBAL ANALYSIS
+    # --------------------------
 
+    def _global_messages(self, endpoints: List[Dict[str, Any]]) -> List[Dict[str, str]]:
         user_prompt = f"""
 API Surface:
-{json.dumps(endpoints, indent=2)}
+{json.dumps([_compact(endpoint) for endpoint in endpoints], separators=COMPACT_SEPARATORS)}
 """
 
-        messages = [
-            {"role": "system", "content": system_prompt.strip()},
+        return [
+            {"role": "system", "content": GLOBAL_SYSTEM_PROMPT},
             {"role": "user", "content": user_prompt.strip()},
         ]
 
-        return self._call_model(messages)
\ No newline at end of file
+    def analyze_global(self, endpoints: List[Dict[str, Any]]) -> Dict[str, Any]:
+        return _as_object(self._call_model(self._global_messages(endpoints)))
+
+    # --------------------------
+    # OFFLINE – PROVIDER BATCH API
+    # --------------------------
+
+    def analyze_via_batch_api(
+        self,
+        endpoints: List[Dict[str, Any]],
+        global_endpoints: List[Dict[str, Any]] | None = None,
+    ) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+        """
+        Run phase 1 and phase 2 as a single OpenAI batch: one request per
+        endpoint plus the global review (over global_endpoints, defaulting
+        to endpoints). Cheaper than real-time calls but blocks until the
+        batch completes. Cached answers are not resubmitted.
+        Returns (per-endpoint results in input order, global result).
+        """
+        conversations = {
+            f"{index}:{endpoint.get('method', '')} {endpoint.get('path', '')}":
+                self._endpoint_messages(endpoint)
+            for index, endpoint in enumerate(endpoints)
+        }
+        conversations["global"] = self._global_messages(
+            endpoints if global_endpoints is None else global_endpoints
+        )
+
+        results: Dict[str, Any] = {}
+        pending: Dict[str, List[Dict[str, str]]] = {}
+
+        for custom_id, messages in conversations.items():
+            cached = self.cache.get(self.cache.make_key(BATCH_MODEL_NAME, messages))
+            if cached is not None:
+                results[custom_id] = cached
+            else:
+                pending[custom_id] = messages
+
+        if pending:
+            try:
+                outcomes = self.batch_client.run(pending)
+            except requests.exceptions.RequestException as exc:
+                outcomes = {
+                    custom_id: {"error": f"HTTP request failed: {str(exc)}"}
+                    for custom_id in pending
+                }
+
+            for custom_id, outcome in outcomes.items():
+                if "content" in outcome:
+                    self._record_cost(
+                        BATCH_MODEL_NAME,
+                        pending[custom_id],
+                        outcome["content"],
+                        outcome.get("usage"),
+                        discount=BATCH_DISCOUNT,
+                    )
+
+                if "content" not in outcome:
+                    results[custom_id] = outcome
+                    continue
+
+                result = _as_object(self._safe_json_parse(outcome["content"]))
+                if "error" not in result:
+                    self.cache.set(
+                        self.cache.make_key(BATCH_MODEL_NAME, pending[custom_id]),
+                        result,
+                    )
+                results[custom_id] = result
+
+        global_result = results.pop("global")
+        return [results[custom_id] for custom_id in conversations if custom_id in results], global_result
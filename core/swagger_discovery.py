@@ -2,12 +2,24 @@
 Swagger/OpenAPI discovery engine.
 
 Attempts to locate Swagger/OpenAPI documentation across common paths.
+All candidate paths are probed concurrently (at most a few in flight, to
+stay below WAF scanner thresholds) over one pooled session, optionally
+shared with the later phases; the first valid spec wins.
 """
 
 import requests
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from requests.adapters import HTTPAdapter
 from urllib.parse import urljoin
 
 
+# Probes in flight at once; enough to overlap latency without a burst
+# that looks like a scanner to WAFs
+MAX_PROBE_CONCURRENCY = 8
+
+# HEAD answers meaning "method not supported" rather than "not found"
+HEAD_UNSUPPORTED_STATUSES = {405, 501}
+
 COMMON_SWAGGER_PATHS = [
     "/swagger.json",
     "/v2/swagger.json",
@@ -27,46 +39,105 @@ COMMON_SWAGGER_PATHS = [
 
 
 class SwaggerDiscovery:
-    def __init__(self, base_url: str):
+    def __init__(
+        self,
+        base_url: str,
+        session: requests.Session | None = None,
+        max_workers: int = MAX_PROBE_CONCURRENCY,
+    ):
         # Normalize base URL once
         self.base_url = base_url.rstrip("/") + "/"
 
-    def discover(self) -> str | None:
-        """
-        Try common Swagger paths and return first valid JSON spec URL.
-        """
-
-        print("\n[+] Starting Swagger discovery...\n")
-
-        for path in COMMON_SWAGGER_PATHS:
-            full_url = urljoin(self.base_url, path.lstrip("/"))
+        # One keep-alive pool for every probe: a single host, so connections
+        # (and TLS sessions) are reused instead of re-handshaking per path.
+        # Mounted on the target prefix only, so a shared session keeps its
+        # retrying adapter elsewhere while probes fail fast.
+        self.session = session or requests.Session()
+        self.max_workers = max_workers
 
-            try:
-                response = requests.get(
-                    full_url,
-                    timeout=5,
-                    verify=False  # Required for HTB self-signed certs
-                )
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_workers)
+        self.session.mount(self.base_url, adapter)
 
-                if response.status_code == 200:
-                    # Check if it looks like a Swagger/OpenAPI spec
-                    content_type = response.headers.get("Content-Type", "")
-                    if "json" in content_type.lower():
-                        try:
-                            data = response.json()
+    def _probe(self, full_url: str) -> str:
+        """
+        Check whether the URL serves something that looks like a Swagger spec.
+        Returns "found", "invalid" or "error"; reporting is left to
+        discover(), since probes run on worker threads.
 
-                            # Minimal validation: must contain "paths"
-                            if "paths" in data:
-                                print(f"[+] Found Swagger at: {full_url}")
-                                return full_url
+        A HEAD request screens out non-JSON responses (e.g. HTML catch-all
+        pages) before any body is downloaded.
+        """
+        try:
+            # verify=False per request (required for HTB self-signed certs)
+            # so a shared session stays verifying for other hosts
+            head = self.session.head(
+                full_url,
+                timeout=3,
+                allow_redirects=True,
+                verify=False,
+            )
+
+            if head.status_code not in HEAD_UNSUPPORTED_STATUSES:
+                content_type = head.headers.get("Content-Type", "")
+                if head.status_code != 200 or "json" not in content_type.lower():
+                    return "invalid"
+
+            response = self.session.get(full_url, timeout=5, verify=False)
+
+            if response.status_code == 200:
+                # Check if it looks like a Swagger/OpenAPI spec
+                content_type = response.headers.get("Content-Type", "")
+                if "json" in content_type.lower():
+                    try:
+                        data = response.json()
+
+                        # Minimal validation: must contain "paths"
+                        if "paths" in data:
+                            return "found"
+
+                    except ValueError:
+                        pass
+
+            return "invalid"
+
+        except requests.RequestException:
+            return "error"
 
-                        except ValueError:
-                            continue
+    def discover(self) -> str | None:
+        """
+        Probe common Swagger paths concurrently (max_workers at a time) and
+        return the first valid JSON spec URL. Queued probes are cancelled
+        once a hit is found.
+        """
 
-                print(f"[!] Tested: {full_url} (not valid Swagger)")
+        print("\n[+] Starting Swagger discovery...\n")
 
-            except requests.RequestException:
-                print(f"[!] Error testing {full_url}")
+        urls = [
+            urljoin(self.base_url, path.lstrip("/"))
+            for path in COMMON_SWAGGER_PATHS
+        ]
+
+        executor = ThreadPoolExecutor(max_workers=min(self.max_workers, len(urls)))
+        futures = {executor.submit(self._probe, url): url for url in urls}
+
+        try:
+            # Printed here, one line per finished probe; probes still running
+            # after a hit are never reported
+            for future in as_completed(futures):
+                full_url = futures[future]
+                status = future.result()
+
+                if status == "found":
+                    print(f"[+] Found Swagger at: {full_url}")
+                    return full_url
+
+                if status == "error":
+                    print(f"[!] Error testing {full_url}")
+                else:
+                    print(f"[!] Tested: {full_url} (not valid Swagger)")
+        finally:
+            # Don't wait for slow probes once we have an answer
+            executor.shutdown(wait=False, cancel_futures=True)
 
         print("[!] No Swagger documentation found.")
-        return None
\ No newline at end of file
+        return None
@@ -3,24 +3,200 @@ Swagger/OpenAPI parsing helpers.
 
 Parses a remote Swagger/OpenAPI JSON spec into normalized endpoint objects
 including parameters, request body fields, and authentication metadata.
+
+The spec is stream-parsed with ijson: only one path item is materialized at a
+time, so large specs never exist in memory as a full Python object tree.
+
+Fetched specs are kept on disk with their ETag/Last-Modified validators, so
+an unchanged spec is answered by a 304 instead of a full download. The
+endpoints extracted from a spec are cached too, keyed by a hash of its bytes,
+so re-analyzing an unchanged spec skips parsing entirely. That cache uses
+orjson when installed (optional dependency), stdlib json otherwise.
 """
 
-import os
+import hashlib
+import io
 import json
+import os
+import ijson  # type: ignore[import-untyped]  # ships no type information
 import requests
 import urllib3
-from typing import List, Dict, Any
+from dataclasses import dataclass, field
+from typing import Iterator, List, Dict, Any
+
+from core._atomic_write import write_atomic
+
+try:
+    import orjson
+except ImportError:  # optional: stdlib json below
+    orjson = None  # type: ignore[assignment]
+
+
+SPEC_CACHE_DIR = os.path.expanduser("~/.cache/ai-api-attack-surface/swagger")
+ENDPOINT_CACHE_DIR = os.path.expanduser("~/.cache/ai-api-attack-surface/endpoints")
+
+
+def _dumps(value: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(value)
+    return json.dumps(value, separators=(",", ":")).encode()
+
+
+def _loads(data: bytes) -> Any:
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+@dataclass
+class EndpointTable:
+    """
+    Extracted endpoints in columnar form: methods and paths (what the
+    tables render) as parallel lists, plus the full per-endpoint records.
+    Iterates and sizes like the list of records.
+    """
+
+    methods: List[str] = field(default_factory=list)
+    paths: List[str] = field(default_factory=list)
+    records: List[Dict[str, Any]] = field(default_factory=list)
+
+    @classmethod
+    def from_records(cls, records: List[Dict[str, Any]]) -> "EndpointTable":
+        return cls(
+            methods=[record["method"] for record in records],
+            paths=[record["path"] for record in records],
+            records=records,
+        )
+
+    def append(self, record: Dict[str, Any]) -> None:
+        self.methods.append(record["method"])
+        self.paths.append(record["path"])
+        self.records.append(record)
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        return iter(self.records)
 
 
 class SwaggerParser:
     """Fetch and parse a Swagger/OpenAPI JSON document."""
 
-    def __init__(self, url: str):
+    def __init__(
+        self,
+        url: str,
+        session: requests.Session | None = None,
+        cache_dir: str | None = SPEC_CACHE_DIR,
+        endpoint_cache_dir: str | None = ENDPOINT_CACHE_DIR,
+    ):
         self.url = url
-        self.swagger_data: Dict[str, Any] | None = None
+        self.spec_bytes: bytes | None = None
+        self.global_security: Any = None
+        # Shared session: reuses the connection discovery already opened
+        self.session = session or requests.Session()
+        # None disables the on-disk spec / extracted-endpoint caches
+        self.cache_dir = cache_dir
+        self.endpoint_cache_dir = endpoint_cache_dir
+        self._spec_hash = ""
+        self._cached_endpoints: List[Dict[str, Any]] | None = None
+
+    def _cache_paths(self) -> tuple[str, str]:
+        """Body and validator files for this URL in cache_dir."""
+        name = hashlib.sha256(self.url.encode()).hexdigest()
+        base = os.path.join(self.cache_dir or "", name)
+        return f"{base}.json", f"{base}.etag"
+
+    def _load_cached(self) -> tuple[bytes, Dict[str, str]] | None:
+        """Cached body and its validators, or None if nothing usable is cached."""
+        if not self.cache_dir:
+            return None
+
+        body_path, etag_path = self._cache_paths()
+
+        try:
+            with open(etag_path, "r", encoding="utf-8") as handle:
+                validators = json.load(handle)
+            with open(body_path, "rb") as handle:
+                return handle.read(), validators
+
+        except (OSError, ValueError):
+            return None
+
+    def _store_cached(self, body: bytes, response: requests.Response) -> None:
+        """Persist body and validators; best-effort, like the LLM cache."""
+        validators = {
+            key: response.headers[header]
+            for key, header in (("etag", "ETag"), ("last_modified", "Last-Modified"))
+            if header in response.headers
+        }
+
+        # Nothing to revalidate against next time
+        if not self.cache_dir or not validators:
+            return
+
+        body_path, etag_path = self._cache_paths()
+
+        try:
+            write_atomic(body_path, body)
+            write_atomic(etag_path, json.dumps(validators).encode())
+
+        except OSError:
+            pass
+
+    def _endpoints_path(self) -> str:
+        return os.path.join(self.endpoint_cache_dir or "", f"{self._spec_hash}.json")
+
+    def _load_endpoints(self) -> Dict[str, Any] | None:
+        """Previously extracted endpoints for the current spec bytes, if any."""
+        if not self.endpoint_cache_dir:
+            return None
+
+        try:
+            with open(self._endpoints_path(), "rb") as handle:
+                cached = _loads(handle.read())
+
+        except (OSError, ValueError):
+            return None
+
+        # Bytes don't survive JSON; rebuild the analyzer's scan key
+        for endpoint in cached["endpoints"]:
+            endpoint["path_ascii"] = endpoint["path"].encode("ascii", "replace").lower()
+
+        return cached
+
+    def _store_endpoints(self, endpoints: List[Dict[str, Any]]) -> None:
+        if not self.endpoint_cache_dir:
+            return
+
+        try:
+            data = _dumps({
+                "global_security": self.global_security,
+                "endpoints": [
+                    {key: value for key, value in endpoint.items() if key != "path_ascii"}
+                    for endpoint in endpoints
+                ],
+            })
+            write_atomic(self._endpoints_path(), data)
+
+        # TypeError: values ijson decoded as Decimal are not serializable
+        except (OSError, TypeError):
+            pass
 
     def fetch_swagger(self) -> bool:
-        """Download JSON spec and cache it in memory."""
+        """
+        Download JSON spec and cache its raw bytes in memory. A cached copy
+        is revalidated with If-None-Match/If-Modified-Since and reused on 304.
+        """
+        cached = self._load_cached()
+
+        headers: Dict[str, str] = {}
+        if cached:
+            if "etag" in cached[1]:
+                headers["If-None-Match"] = cached[1]["etag"]
+            if "last_modified" in cached[1]:
+                headers["If-Modified-Since"] = cached[1]["last_modified"]
+
         try:
             # Enable insecure mode only for lab environments
             htb_mode = os.getenv("HTB_MODE", "0") == "1"
@@ -28,36 +204,61 @@ class SwaggerParser:
             if htb_mode:
                 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
-            response = requests.get(
+            response = self.session.get(
                 self.url,
                 timeout=10,
                 verify=not htb_mode,
+                headers=headers,
             )
 
-            response.raise_for_status()
-            self.swagger_data = response.json()
-            return True
+            if response.status_code == 304 and cached:
+                print("[*] Swagger unchanged since last fetch; using cached copy.")
+                spec_bytes = cached[0]
+            else:
+                response.raise_for_status()
+                spec_bytes = response.content
+
+            self._spec_hash = hashlib.sha256(spec_bytes).hexdigest()
+            cached_endpoints = self._load_endpoints()
+
+            if cached_endpoints is not None:
+                # Already parsed (and validated) this exact document
+                securities = [cached_endpoints["global_security"]]
+            else:
+                # Pre-pass for the top-level "security" key. Scanning to the
+                # end also validates the whole document without building it.
+                securities = list(ijson.items(io.BytesIO(spec_bytes), "security"))
 
         except requests.exceptions.RequestException as exc:
             print(f"[!] Error fetching Swagger: {exc}")
             return False
 
-        except ValueError:
+        except ijson.JSONError:
             print("[!] Response is not valid JSON.")
             return False
 
-    def extract_endpoints(self) -> List[Dict[str, Any]]:
+        if response.status_code != 304:
+            self._store_cached(spec_bytes, response)
+
+        self.spec_bytes = spec_bytes
+        self.global_security = securities[0] if securities else None
+        self._cached_endpoints = cached_endpoints["endpoints"] if cached_endpoints else None
+        return True
+
+    def extract_endpoints(self) -> EndpointTable:
         """Extract structured endpoint metadata from the spec."""
-        if not self.swagger_data:
+        if not self.spec_bytes:
             print("[!] No Swagger data loaded.")
-            return []
+            return EndpointTable()
+
+        if self._cached_endpoints is not None:
+            return EndpointTable.from_records(self._cached_endpoints)
 
-        endpoints: List[Dict[str, Any]] = []
+        endpoints = EndpointTable()
 
-        paths = self.swagger_data.get("paths", {})
-        global_security = self.swagger_data.get("security")
+        global_security = self.global_security
 
-        for path, methods in paths.items():
+        for path, methods in ijson.kvitems(io.BytesIO(self.spec_bytes), "paths"):
             for method, details in methods.items():
 
                 if method.lower() not in {
@@ -67,6 +268,9 @@ class SwaggerParser:
 
                 endpoint: Dict[str, Any] = {
                     "path": path,
+                    # Lowercased ASCII bytes for the analyzer's keyword scan;
+                    # "replace" keeps character offsets aligned with path
+                    "path_ascii": path.encode("ascii", "replace").lower(),
                     "method": method.upper(),
                     "parameters": [],
                     "auth_required": bool(details.get("security", global_security)),
@@ -105,4 +309,5 @@ class SwaggerParser:
 
                 endpoints.append(endpoint)
 
+        self._store_endpoints(endpoints.records)
         return endpoints
\ No newline at end of file
@@ -7,24 +7,59 @@ This module wires together three phases:
 """
 
 import argparse
+import json
+import os
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
 
+import requests
+from requests.adapters import HTTPAdapter
 from rich import box
 from rich.console import Console
+from rich.live import Live
 from rich.panel import Panel
+from rich.progress import BarColumn, MofNCompleteColumn, Progress, TextColumn, TimeElapsedColumn
 from rich.table import Table
-from core.llm_engine import LLMEngine
-from core.analyzer import AttackSurfaceAnalyzer
+from urllib3.util.retry import Retry
+from core.batch_client import BATCH_MODEL_NAME
+from core.llm_engine import MODEL_CHEAP, LLMEngine, canonical_key, mount_provider_adapter
+from core.analyzer import AttackSurfaceAnalyzer, analyze_chunk
 from core.swagger_discovery import SwaggerDiscovery
 from core.swagger_parser import SwaggerParser
 
 console = Console()
 
-
-def run_discovery(target: str) -> str | None:
+# One keep-alive pool shared by discovery, spec fetch and LLM calls, so
+# no phase pays a fresh TCP/TLS handshake per request. Discovery and the
+# LLM provider get their own adapters on their hosts' prefixes. Every
+# mount happens on the main thread before a worker thread touches the
+# session: Session.mount() is not thread-safe.
+SESSION = requests.Session()
+_adapter = HTTPAdapter(
+    pool_connections=32,
+    pool_maxsize=64,
+    max_retries=Retry(total=3, backoff_factor=0.3),
+)
+SESSION.mount("http://", _adapter)
+SESSION.mount("https://", _adapter)
+mount_provider_adapter(SESSION, pool_maxsize=64)
+
+# Below this many endpoints, process start-up and pickling cost more than
+# the heuristic analysis itself, so it stays in-process.
+PARALLEL_ANALYSIS_MIN_ENDPOINTS = 20_000
+
+# Fields kept on endpoints for internal use only (matching, rendering),
+# left out when an endpoint is shown to the user
+INTERNAL_ENDPOINT_KEYS = frozenset({"path_ascii", "risk_signals_str"})
+
+# Findings-table style of the model each endpoint is routed to
+CHEAP_MODEL_STYLE = "green"
+STRONG_MODEL_STYLE = "bold red"
+
+
+def run_discovery(discovery: SwaggerDiscovery) -> str | None:
     """Discover likely Swagger/OpenAPI URL and return it."""
     console.print("\n[bold yellow][*] Starting Swagger discovery...[/bold yellow]\n")
 
-    discovery = SwaggerDiscovery(target)
     swagger_url = discovery.discover()
 
     if not swagger_url:
@@ -35,10 +70,75 @@ def run_discovery(target: str) -> str | None:
     return swagger_url
 
 
-def run_analysis(swagger_url: str) -> None:
+def analyze_endpoints(endpoints: list[dict]) -> list[dict]:
+    """Run heuristics, spreading very large specs across CPU cores."""
+    workers = os.cpu_count() or 1
+
+    if len(endpoints) < PARALLEL_ANALYSIS_MIN_ENDPOINTS or workers < 2:
+        return AttackSurfaceAnalyzer(endpoints).analyze()
+
+    chunk_size = -(-len(endpoints) // workers)
+    chunks = [
+        endpoints[start:start + chunk_size]
+        for start in range(0, len(endpoints), chunk_size)
+    ]
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return [
+            endpoint
+            for chunk_result in executor.map(analyze_chunk, chunks)
+            for endpoint in chunk_result
+        ]
+
+
+def load_checkpoint(path: str) -> dict[tuple[str, str], dict]:
+    """
+    Endpoint verdicts already written to a results JSONL file, by canonical
+    key. A line cut short by an interrupted run is ignored.
+    """
+    completed: dict[tuple[str, str], dict] = {}
+
+    try:
+        with open(path, "r", encoding="utf-8") as handle:
+            for line in handle:
+                try:
+                    record = json.loads(line)
+                    completed[tuple(record["key"])] = record["analysis"]
+                except (ValueError, KeyError, TypeError):
+                    continue
+
+    except FileNotFoundError:
+        pass
+
+    return completed
+
+
+def open_checkpoint(path: str):
+    """Open a results JSONL file for appending, terminating a cut-short last line."""
+    checkpoint = open(path, "a+", encoding="utf-8")
+
+    if checkpoint.tell() > 0:
+        checkpoint.seek(checkpoint.tell() - 1)
+        if checkpoint.read(1) != "\n":
+            checkpoint.write("\n")
+
+    return checkpoint
+
+
+def run_analysis(
+    swagger_url: str,
+    batch: bool = False,
+    use_cache: bool = True,
+    min_signals: int = 1,
+    llm_future: Future | None = None,
+    output: str | None = None,
+    qps: float | None = None,
+    max_concurrency: int = 8,
+    budget_usd: float | None = None,
+) -> None:
     console.print(f"\n[bold cyan][*] Fetching Swagger from:[/bold cyan] {swagger_url}\n")
 
-    parser = SwaggerParser(swagger_url)
+    parser = SwaggerParser(swagger_url, session=SESSION)
 
     if not parser.fetch_swagger():
         console.print("[bold red][!] Failed to fetch Swagger.[/bold red]")
@@ -50,19 +150,17 @@ def run_analysis(swagger_url: str) -> None:
         console.print("[bold red][!] No endpoints found.[/bold red]")
         return
 
-    # Show extracted endpoints
+    # Show extracted endpoints; rows render live as they are added
     table = Table(title="Extracted Endpoints", box=box.MINIMAL_DOUBLE_HEAD)
     table.add_column("Method", style="bold magenta")
     table.add_column("Path", style="cyan")
 
-    for endpoint in endpoints:
-        table.add_row(endpoint["method"], endpoint["path"])
-
-    console.print(table)
+    with Live(table, console=console, refresh_per_second=10):
+        for method, path in zip(endpoints.methods, endpoints.paths):
+            table.add_row(method, path)
 
     # Heuristic Analyzer
-    analyzer = AttackSurfaceAnalyzer(endpoints)
-    enriched_endpoints = analyzer.analyze()
+    enriched_endpoints = analyze_endpoints(endpoints.records)
 
     if not enriched_endpoints:
         console.print("\n[bold green][+] No obvious structural risk signals detected.[/bold green]\n")
@@ -70,37 +168,143 @@ def run_analysis(swagger_url: str) -> None:
 
     # Show heuristic signals
     findings_table = Table(title="Heuristic Risk Signals", box=box.MINIMAL_DOUBLE_HEAD)
+    findings_table.add_column("Severity", style="bold")
     findings_table.add_column("Method", style="magenta")
     findings_table.add_column("Path", style="cyan")
     findings_table.add_column("Signals", style="yellow")
-
-    for endpoint in enriched_endpoints:
-        findings_table.add_row(
-            endpoint["method"],
-            endpoint["path"],
-            " | ".join(endpoint.get("risk_signals", [])),
-        )
-
-    console.print(findings_table)
+    findings_table.add_column("Model")
+
+    with Live(findings_table, console=console, refresh_per_second=10):
+        for endpoint in enriched_endpoints:
+            # Batch mode sends everything to a single model
+            model = BATCH_MODEL_NAME if batch else LLMEngine.select_model(endpoint)
+            model_style = CHEAP_MODEL_STYLE if model == MODEL_CHEAP else STRONG_MODEL_STYLE
+
+            findings_table.add_row(
+                endpoint["severity"],
+                endpoint["method"],
+                endpoint["path"],
+                endpoint.get("risk_signals_str", ""),
+                f"[{model_style}]{model}[/{model_style}]",
+            )
 
     # -------- LLM Phase 1 --------
 
     console.print("\n[bold cyan]Running LLM Endpoint Analysis...[/bold cyan]\n")
 
-    llm = LLMEngine()
     endpoint_results = []
 
-    for endpoint in enriched_endpoints:
-        result = llm.analyze_endpoint(endpoint)
+    # Endpoints differing only by parameter name (or listed under several
+    # tags) get one LLM verdict, fanned back out below
+    canonical_keys = [canonical_key(endpoint) for endpoint in enriched_endpoints]
+    unique_by_key: dict[tuple[str, str], dict] = {}
+    for key, endpoint in zip(canonical_keys, enriched_endpoints):
+        unique_by_key.setdefault(key, endpoint)
+    unique_endpoints = list(unique_by_key.values())
+
+    if len(unique_endpoints) < len(enriched_endpoints):
+        console.print(
+            f"[*] Deduped {len(enriched_endpoints)} → {len(unique_endpoints)} endpoints "
+            f"({len(enriched_endpoints) - len(unique_endpoints)} fewer endpoints to analyze)\n"
+        )
+
+    # Low-signal endpoints skip per-endpoint analysis; the global review
+    # still sees them as part of the full list
+    hot_by_key = {
+        key: endpoint
+        for key, endpoint in unique_by_key.items()
+        if len(endpoint.get("risk_signals", [])) >= min_signals
+    }
+    pruned = len(unique_by_key) - len(hot_by_key)
+
+    # Resume: verdicts checkpointed by an earlier (interrupted) run are
+    # reused; only the rest go to the model
+    completed = load_checkpoint(output) if output else {}
+    analysis_by_key = {key: completed[key] for key in hot_by_key if key in completed}
+
+    if analysis_by_key:
+        console.print(
+            f"[*] Resuming: {len(analysis_by_key)} endpoints already analyzed in {output}\n"
+        )
+
+    todo_keys = [key for key in hot_by_key if key not in analysis_by_key]
+    hot_endpoints = [hot_by_key[key] for key in todo_keys]
+
+    checkpoint = open_checkpoint(output) if output else None
+
+    def record(index: int, result: dict) -> None:
+        """Append one verdict as it completes; failures are retried next run."""
+        if checkpoint and "error" not in result:
+            checkpoint.write(json.dumps({"key": list(todo_keys[index]), "analysis": result}) + "\n")
+            checkpoint.flush()
+
+    try:
+        if batch:
+            # Non-interactive: both phases go out as one discounted provider batch
+            console.print("[yellow]Submitted via Batch API; results may take a while.[/yellow]\n")
+            llm = LLMEngine(batch_api=True, use_cache=use_cache, budget_usd=budget_usd)
+            analyses, global_result = llm.analyze_via_batch_api(
+                hot_endpoints,
+                global_endpoints=unique_endpoints,
+            )
+            for index, result in enumerate(analyses):
+                record(index, result)
+        else:
+            # Built in the background by the caller, if it prefetched one
+            llm = (_prefetched(llm_future) if llm_future else None) or LLMEngine(
+                max_concurrency=max_concurrency,
+                use_cache=use_cache,
+                session=SESSION,
+                qps=qps,
+                budget_usd=budget_usd,
+            )
+
+            # The global review doesn't depend on endpoint verdicts, so it runs
+            # alongside phase 1 instead of after it
+            background = ThreadPoolExecutor(max_workers=1)
+            global_future = background.submit(llm.analyze_global, unique_endpoints)
+            background.shutdown(wait=False)
+
+            progress = Progress(
+                TextColumn("[cyan]{task.description}"),
+                BarColumn(),
+                MofNCompleteColumn(),
+                TimeElapsedColumn(),
+                console=console,
+                transient=True,
+            )
+
+            with progress:
+                task = progress.add_task("Endpoints analyzed", total=None)
+                analyses = llm.analyze_endpoints_batch(
+                    hot_endpoints,
+                    on_progress=lambda done, total: progress.update(
+                        task, completed=done, total=total
+                    ),
+                    on_result=record,
+                )
+    finally:
+        if checkpoint:
+            checkpoint.close()
+
+    analysis_by_key.update(zip(todo_keys, analyses))
+
+    for key, endpoint in zip(canonical_keys, enriched_endpoints):
+        if key not in analysis_by_key:
+            continue
         endpoint_results.append({
             "endpoint": endpoint,
-            "analysis": result
+            "analysis": analysis_by_key[key]
         })
 
     # Print endpoint-level LLM results
     for item in endpoint_results:
         console.print("\n[bold magenta]Endpoint:[/bold magenta]")
-        console.print(item["endpoint"])
+        console.print({
+            key: value
+            for key, value in item["endpoint"].items()
+            if key not in INTERNAL_ENDPOINT_KEYS
+        })
         console.print("[bold yellow]LLM Analysis:[/bold yellow]")
         console.print(item["analysis"])
 
@@ -108,14 +312,89 @@ def run_analysis(swagger_url: str) -> None:
 
     console.print("\n[bold cyan]Running Global API Analysis...[/bold cyan]\n")
 
-    global_result = llm.analyze_global(enriched_endpoints)
+    if not batch:
+        global_result = global_future.result()
 
     console.print("\n[bold green]Global Risk Assessment:[/bold green]\n")
     console.print(global_result)
 
+    if llm.over_budget():
+        console.print(
+            f"\n[bold red][!] Budget of ${llm.budget_usd:.4f} reached; remaining LLM "
+            f"calls were skipped (rerun with --output to resume).[/bold red]"
+        )
+
+    if llm.cost.calls:
+        cost = llm.cost
+        budget = f" / ${llm.budget_usd:.4f}" if llm.budget_usd is not None else ""
+        estimated = f" ({cost.estimated_calls} estimated)" if cost.estimated_calls else ""
+        # Only reported usage says how much of the prompt was served from cache
+        cached = (
+            f" ({cost.cached_prompt_tokens:,} cached)"
+            if cost.estimated_calls < cost.calls
+            else ""
+        )
+        console.print()
+        console.print(
+            Panel(
+                f"Spent [bold]${cost.usd:.4f}[/bold]{budget} across {cost.calls} calls{estimated}\n"
+                f"{cost.prompt_tokens:,} prompt{cached} + "
+                f"{cost.completion_tokens:,} completion tokens",
+                title="LLM Cost",
+                expand=False,
+            )
+        )
+
+    if pruned:
+        console.print(
+            f"\n[dim][*] Pruned {pruned} endpoints with fewer than {min_signals} "
+            f"signals from per-endpoint analysis (covered by the global review)[/dim]"
+        )
+
+
+def _warm_engine(engine_future: Future) -> None:
+    """Pre-connect the prefetched engine to the provider, if it was built."""
+    if engine_future.exception() is None:
+        engine_future.result().warm_up()
+
+
+def _prefetched(engine_future: Future) -> LLMEngine | None:
+    """
+    The engine built in the background, or None so run_analysis builds it
+    itself and reports a configuration error at the usual point.
+    """
+    try:
+        return engine_future.result()
+    except ValueError:
+        return None
+
+
+def prefetch_engine(**engine_kwargs) -> Future:
+    """
+    Build LLMEngine and pre-connect it to the provider on a background
+    thread, overlapping with discovery and the spec download.
+    """
+    executor = ThreadPoolExecutor(max_workers=1)
+    engine_future = executor.submit(LLMEngine, session=SESSION, **engine_kwargs)
+    executor.submit(_warm_engine, engine_future)
+    executor.shutdown(wait=False)
+    return engine_future
+
 
 def interactive_menu() -> None:
     """Render the TUI menu used when no CLI subcommand is provided."""
+    # Build the LLM engine while the user reads the menu and types; one
+    # worker, so a queued warm-up always runs after construction
+    prefetch = ThreadPoolExecutor(max_workers=1)
+    engine_future = prefetch.submit(LLMEngine, session=SESSION)
+
+    try:
+        _menu(prefetch, engine_future)
+    finally:
+        prefetch.shutdown(wait=False)
+
+
+def _menu(prefetch: ThreadPoolExecutor, engine_future: Future) -> None:
     console.print(
         Panel(
             "[bold cyan]AI API Attack Surface Analyzer v0.1[/bold cyan]",
@@ -133,17 +412,22 @@ def interactive_menu() -> None:
 
     if choice == "1":
         target = input("➜ Enter base URL (e.g. https://api.target.com): ").strip()
-        run_discovery(target)
+        run_discovery(SwaggerDiscovery(target, session=SESSION))
 
     elif choice == "2":
+        # The LLM phase is coming: open the provider connection while the
+        # user types the URL
+        prefetch.submit(_warm_engine, engine_future)
         swagger_url = input("➜ Enter full Swagger JSON URL: ").strip()
-        run_analysis(swagger_url)
+        run_analysis(swagger_url, llm_future=engine_future)
 
     elif choice == "3":
         target = input("➜ Enter base URL: ").strip()
-        swagger_url = run_discovery(target)
+        discovery = SwaggerDiscovery(target, session=SESSION)
+        prefetch.submit(_warm_engine, engine_future)
+        swagger_url = run_discovery(discovery)
         if swagger_url:
-            run_analysis(swagger_url)
+            run_analysis(swagger_url, llm_future=engine_future)
 
     elif choice == "4":
         console.print("\n[bold green]Exiting.[/bold green]\n")
@@ -153,6 +437,22 @@ def interactive_menu() -> None:
         console.print("\n[bold red]Invalid option.[/bold red]\n")
 
 
+def positive_int(value: str) -> int:
+    """argparse type for counts that must be at least 1."""
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be a positive integer, got {value}")
+    return number
+
+
+def positive_float(value: str) -> float:
+    """argparse type for rates and amounts that must be above zero."""
+    number = float(value)
+    if not number > 0:
+        raise argparse.ArgumentTypeError(f"must be a positive number, got {value}")
+    return number
+
+
 def main() -> None:
     """Parse command-line arguments and dispatch the selected workflow."""
     parser = argparse.ArgumentParser(description="AI API Attack Surface Analyzer")
@@ -162,10 +462,58 @@ def main() -> None:
     discover_parser = subparsers.add_parser("discover", help="Discover Swagger endpoints")
     discover_parser.add_argument("target", help="Base URL")
 
-    analyze_parser = subparsers.add_parser("analyze", help="Analyze Swagger JSON")
+    # Options shared by the analyze and scan commands
+    analysis_options = argparse.ArgumentParser(add_help=False)
+    analysis_options.add_argument(
+        "--batch",
+        action="store_true",
+        help="Run LLM analysis through the OpenAI Batch API (cheaper, not real-time)",
+    )
+    analysis_options.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Ignore and don't store cached LLM responses",
+    )
+    analysis_options.add_argument(
+        "--min-signals",
+        type=int,
+        default=1,
+        help="Minimum heuristic signals for per-endpoint LLM analysis (default: 1)",
+    )
+    analysis_options.add_argument(
+        "--output",
+        metavar="RESULTS_JSONL",
+        help="Checkpoint endpoint verdicts to this JSONL file and resume from it",
+    )
+    analysis_options.add_argument(
+        "--qps",
+        type=positive_float,
+        help="Maximum LLM requests per second (default: unlimited)",
+    )
+    analysis_options.add_argument(
+        "--max-concurrency",
+        type=positive_int,
+        default=8,
+        help="Maximum concurrent LLM requests (default: 8)",
+    )
+    analysis_options.add_argument(
+        "--budget-usd",
+        type=positive_float,
+        help="Stop issuing LLM calls once this much has been spent (not with --batch)",
+    )
+
+    analyze_parser = subparsers.add_parser(
+        "analyze",
+        help="Analyze Swagger JSON",
+        parents=[analysis_options],
+    )
     analyze_parser.add_argument("swagger_url", help="Full Swagger JSON URL")
 
-    scan_parser = subparsers.add_parser("scan", help="Discover and analyze automatically")
+    scan_parser = subparsers.add_parser(
+        "scan",
+        help="Discover and analyze automatically",
+        parents=[analysis_options],
+    )
     scan_parser.add_argument("target", help="Base URL")
 
     args = parser.parse_args()
@@ -175,15 +523,45 @@ def main() -> None:
         return
 
     if args.command == "discover":
-        run_discovery(args.target)
+        run_discovery(SwaggerDiscovery(args.target, session=SESSION))
+        return
 
-    elif args.command == "analyze":
-        run_analysis(args.swagger_url)
+    # Batch spend is only billed once the whole batch has run
+    if args.batch and args.budget_usd is not None:
+        parser.error("--budget-usd cannot be combined with --batch")
+
+    if args.command == "scan":
+        discovery = SwaggerDiscovery(args.target, session=SESSION)
+
+    # Real-time runs build the engine up front, alongside discovery and
+    # the spec download; batch runs use their own client
+    engine_future = None
+    if not args.batch:
+        engine_future = prefetch_engine(
+            max_concurrency=args.max_concurrency,
+            use_cache=not args.no_cache,
+            qps=args.qps,
+            budget_usd=args.budget_usd,
+        )
 
-    elif args.command == "scan":
-        swagger_url = run_discovery(args.target)
-        if swagger_url:
-            run_analysis(swagger_url)
+    if args.command == "analyze":
+        swagger_url = args.swagger_url
+    else:
+        swagger_url = run_discovery(discovery)
+        if not swagger_url:
+            return
+
+    run_analysis(
+        swagger_url,
+        batch=args.batch,
+        use_cache=not args.no_cache,
+        min_signals=args.min_signals,
+        llm_future=engine_future,
+        output=args.output,
+        qps=args.qps,
+        max_concurrency=args.max_concurrency,
+        budget_usd=args.budget_usd,
+    )
 
 
 if __name__ == "__main__":